@@ -1,9 +1,14 @@
 import asyncio
+import logging
 from collections.abc import Awaitable, Callable
 from datetime import UTC, datetime, timedelta
+from typing import Any
 
 from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.datastructures import State
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
+from pydantic_core import to_json
 
 from app.database import InMemoryKeyValueDatabase
 from app.intent import (
@@ -17,6 +22,21 @@ router = APIRouter()
 
 NowFn = Callable[[], datetime]
 SleepFn = Callable[[float], Awaitable[None]]
+NotifyFn = Callable[[str, str], Awaitable[None]]
+
+# cap on notification tasks (and so sends in flight) at once, keeps the event
+# loop's ready queue short when a role has a large caregiver pool
+NOTIFY_CONCURRENCY = 64
+
+
+class PydanticCoreJSONResponse(JSONResponse):
+    """
+    JSON response rendered by pydantic-core's serializer instead of the
+    stdlib json module (same idea as ORJSONResponse, without a new dependency).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
 
 
 class InboundMessageRequest(BaseModel):
@@ -36,8 +56,8 @@ async def fanout_shift(shift_id: str, request: Request) -> dict:
         request.app.state.database
     )
 
-    shift = db.get(f"shift:{shift_id}")
-    if not shift or not isinstance(shift, Shift):
+    shift = db.get_shift(f"shift:{shift_id}")
+    if not shift:
         raise HTTPException(status_code=404, detail="Shift not found")
 
     # idempotency: set before any awaits so concurrent calls can't interleave here
@@ -49,16 +69,14 @@ async def fanout_shift(shift_id: str, request: Request) -> dict:
         }
 
     shift.fanout_started_at = request.app.state.now_fn()
-    db.put(f"shift:{shift_id}", shift)
 
-    caregivers = [
-        c
-        for c in db.all()
-        if isinstance(c, Caregiver) and c.role == shift.role_required
-    ]
+    caregivers = db.get_caregivers_by_role(shift.role_required)
+    shift.fanout_caregiver_ids = [c.id for c in caregivers]
 
-    message = f"Shift {shift_id} available. Reply 'yes' to accept."
-    await asyncio.gather(*(send_sms(c.phone, message) for c in caregivers))
+    shift.notification_message = _shift_available_message(shift_id)
+    await _notify_all(
+        send_sms, [c.phone for c in caregivers], shift.notification_message
+    )
 
     task = asyncio.create_task(
         escalate_if_unfilled(
@@ -68,14 +86,10 @@ async def fanout_shift(shift_id: str, request: Request) -> dict:
             sleep_fn=request.app.state.sleep_fn,
         )
     )
-    request.app.state.escalation_tasks.add(task)
-    request.app.state.escalation_tasks_by_shift[shift_id] = task
-
-    def _cleanup(_t: asyncio.Task) -> None:
-        request.app.state.escalation_tasks.discard(_t)
-        request.app.state.escalation_tasks_by_shift.pop(shift_id, None)
-
-    task.add_done_callback(_cleanup)
+    # this dict also keeps the strong reference the task needs to not be gc'd
+    tasks_by_shift = request.app.state.escalation_tasks_by_shift
+    tasks_by_shift[shift_id] = task
+    task.add_done_callback(lambda _t: tasks_by_shift.pop(shift_id, None))
 
     return {
         "shift_id": shift_id,
@@ -86,37 +100,37 @@ async def fanout_shift(shift_id: str, request: Request) -> dict:
 
 
 @router.post("/messages/inbound")
-async def handle_inbound_message(
+async def receive_inbound_message(
     message: InboundMessageRequest, request: Request
 ) -> dict:
-    db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = (
-        request.app.state.database
-    )
+    return await handle_inbound_message(request.app.state, message)
 
-    caregiver = next(
-        (
-            c
-            for c in db.all()
-            if isinstance(c, Caregiver) and c.phone == message.from_
-        ),
-        None,
-    )
+
+async def handle_inbound_message(
+    state: State, message: InboundMessageRequest
+) -> dict:
+    """
+    Apply a caregiver's reply to a shift. Kept separate from the route so it
+    can be called with an already-parsed message.
+    """
+    db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = state.database
+
+    caregiver = db.get_caregiver_by_phone(message.from_)
     if not caregiver:
         raise HTTPException(
             status_code=404, detail="Caregiver not found for phone number"
         )
 
-    shift = db.get(f"shift:{message.shift_id}")
-    if not shift or not isinstance(shift, Shift):
+    shift_key = f"shift:{message.shift_id}"
+    shift = db.get_shift(shift_key)
+    if not shift:
         raise HTTPException(status_code=404, detail="Shift not found")
 
     intent = await parse_shift_request_message_intent(message.body)
 
     if intent == ShiftRequestMessageIntent.ACCEPT:
-        claimed_at = request.app.state.now_fn()
-        claimed = db.claim_shift_if_unclaimed(
-            f"shift:{message.shift_id}", caregiver.id, claimed_at
-        )
+        claimed_at = state.now_fn()
+        claimed = db.claim_shift(shift_key, caregiver.id, claimed_at)
 
         if not claimed:
             return {
@@ -126,7 +140,7 @@ async def handle_inbound_message(
             }
 
         # cancel escalation (if sleeping)
-        task = request.app.state.escalation_tasks_by_shift.get(message.shift_id)
+        task = state.escalation_tasks_by_shift.get(message.shift_id)
         if task is not None:
             task.cancel()
 
@@ -138,9 +152,8 @@ async def handle_inbound_message(
         }
 
     if intent == ShiftRequestMessageIntent.DECLINE:
-        if caregiver.id not in shift.declined_caregiver_ids:
-            shift.declined_caregiver_ids.append(caregiver.id)
-            db.put(f"shift:{message.shift_id}", shift)
+        # shift is the stored object; declines aren't indexed, so no re-put
+        shift.declined_caregiver_ids.add(caregiver.id)
 
     return {
         "status": "not_claimed",
@@ -156,12 +169,9 @@ async def escalate_if_unfilled(
     now_fn: NowFn,
     sleep_fn: SleepFn,
 ) -> None:
-    shift = db.get(f"shift:{shift_id}")
-    if (
-        not shift
-        or not isinstance(shift, Shift)
-        or shift.fanout_started_at is None
-    ):
+    shift_key = f"shift:{shift_id}"
+    shift = db.get_shift(shift_key)
+    if not shift or shift.fanout_started_at is None:
         return
 
     start = shift.fanout_started_at
@@ -175,29 +185,70 @@ async def escalate_if_unfilled(
         if remaining > 0:
             await sleep_fn(remaining)
 
-        shift = db.get(f"shift:{shift_id}")
-        if not shift or not isinstance(shift, Shift) or shift.claimed:
+        shift = db.get_shift(shift_key)
+        if not shift or shift.claimed:
             return
 
-        caregivers = [
-            c
-            for c in db.all()
-            if isinstance(c, Caregiver)
-            and c.role == shift.role_required
-            and c.id not in shift.declined_caregiver_ids
-        ]
-
-        message = f"Shift {shift_id} available. Reply 'yes' to accept."
-        await asyncio.gather(
-            *(place_phone_call(c.phone, message) for c in caregivers)
+        # only re-contact the caregivers from the sms round who haven't
+        # declined. A shift fanned out elsewhere has no sms round recorded,
+        # so fall back to everyone with the role and rebuild the message.
+        if shift.fanout_caregiver_ids is None:
+            caregivers = db.get_caregivers_by_role(shift.role_required)
+        else:
+            # a caregiver whose role changed since the sms round no longer
+            # qualifies for this shift
+            caregivers = [
+                c
+                for cid in shift.fanout_caregiver_ids
+                if (c := db.get_caregiver_by_id(cid)) is not None
+                and c.role == shift.role_required
+            ]
+        message = shift.notification_message or _shift_available_message(
+            shift_id
+        )
+
+        await _notify_all(
+            place_phone_call,
+            [
+                c.phone
+                for c in caregivers
+                if c.id not in shift.declined_caregiver_ids
+            ],
+            message,
         )
 
     except asyncio.CancelledError:
         return
 
 
+def _shift_available_message(shift_id: str) -> str:
+    return f"Shift {shift_id} available. Reply 'yes' to accept."
+
+
+async def _notify_all(
+    notify: NotifyFn,
+    phones: list[str],
+    message: str,
+    limit: int = NOTIFY_CONCURRENCY,
+) -> None:
+    """
+    Send message to every phone from at most limit worker tasks pulling off
+    one shared iterator. A failed send is logged and doesn't stop the others.
+    """
+    remaining = iter(phones)
+
+    async def worker() -> None:
+        for phone in remaining:
+            try:
+                await notify(phone, message)
+            except Exception:
+                logging.exception(f"Failed to notify {phone}")
+
+    await asyncio.gather(*[worker() for _ in range(min(limit, len(phones)))])
+
+
 def create_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(default_response_class=PydanticCoreJSONResponse)
     db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = (
         InMemoryKeyValueDatabase()
     )
@@ -206,7 +257,6 @@ def create_app() -> FastAPI:
     app.state.now_fn = lambda: datetime.now(UTC)
     app.state.sleep_fn = asyncio.sleep
 
-    app.state.escalation_tasks = set()
     app.state.escalation_tasks_by_shift = {}
 
     app.include_router(router)
@@ -1,6 +1,10 @@
-from collections.abc import Iterator, MutableMapping
+from collections import defaultdict
+from collections.abc import Iterator, Mapping
+from datetime import datetime
 from typing import TypeVar
 
+from app.models import Caregiver, Shift
+
 K = TypeVar("K")
 V = TypeVar("V")
 
@@ -11,15 +15,48 @@ class InMemoryKeyValueDatabase[K, V]:
     """
 
     def __init__(self) -> None:
-        self._store: MutableMapping[K, V] = {}
+        self._store: dict[K, V] = {}
+        # typed partitions of _store, routed once at write time so readers
+        # can iterate shifts or caregivers without isinstance filtering
+        self._shifts: dict[K, Shift] = {}
+        self._caregivers: dict[K, Caregiver] = {}
+        # secondary index, kept in sync by put/delete so fanout and escalation
+        # don't have to scan every entity to find caregivers for a role
+        self._caregivers_by_role: defaultdict[str, dict[K, Caregiver]] = (
+            defaultdict(dict)
+        )
+        # inbound messages identify the caregiver by phone number
+        self._caregiver_by_phone: dict[str, Caregiver] = {}
+        self._caregiver_by_id: dict[str, Caregiver] = {}
+        # (role, phone, id) each caregiver was indexed under. Callers mutate
+        # stored objects and put them again, so eviction can't trust the
+        # values on the live object.
+        self._indexed: dict[K, tuple[str, str, str]] = {}
 
     def put(self, key: K, value: V) -> None:
+        self._unindex(key)
         self._store[key] = value
+        if isinstance(value, Shift):
+            self._shifts[key] = value
+        elif isinstance(value, Caregiver):
+            self._caregivers[key] = value
+            self._caregivers_by_role[value.role][key] = value
+            self._caregiver_by_phone[value.phone] = value
+            self._caregiver_by_id[value.id] = value
+            self._indexed[key] = (value.role, value.phone, value.id)
+
+    def bulk_load(self, items: Mapping[K, V]) -> None:
+        """
+        Put every item in the mapping, keeping all indexes up to date.
+        """
+        for key, value in items.items():
+            self.put(key, value)
 
     def get(self, key: K) -> V | None:
         return self._store.get(key)
 
     def delete(self, key: K) -> None:
+        self._unindex(key)
         self._store.pop(key, None)
 
     def all(self) -> list[V]:
@@ -27,6 +64,12 @@ class InMemoryKeyValueDatabase[K, V]:
 
     def clear(self) -> None:
         self._store.clear()
+        self._shifts.clear()
+        self._caregivers.clear()
+        self._caregivers_by_role.clear()
+        self._caregiver_by_phone.clear()
+        self._caregiver_by_id.clear()
+        self._indexed.clear()
 
     def __iter__(self) -> Iterator[V]:
         return iter(self._store.values())
@@ -34,23 +77,61 @@ class InMemoryKeyValueDatabase[K, V]:
     def __len__(self) -> int:
         return len(self._store)
 
-    def claim_shift_if_unclaimed(
-        self, key: K, claimer_id: str, claimed_at
+    def get_shift(self, key: K) -> Shift | None:
+        return self._shifts.get(key)
+
+    def iter_shifts(self) -> Iterator[Shift]:
+        return iter(self._shifts.values())
+
+    def iter_caregivers(self) -> Iterator[Caregiver]:
+        return iter(self._caregivers.values())
+
+    def get_caregivers_by_role(self, role: str) -> list[Caregiver]:
+        """
+        Return all caregivers with the given role, using the role index.
+        """
+        caregivers = self._caregivers_by_role.get(role)
+        return list(caregivers.values()) if caregivers else []
+
+    def get_caregiver_by_phone(self, phone: str) -> Caregiver | None:
+        """
+        Return the caregiver with the given phone number, if any.
+        """
+        return self._caregiver_by_phone.get(phone)
+
+    def get_caregiver_by_id(self, caregiver_id: str) -> Caregiver | None:
+        return self._caregiver_by_id.get(caregiver_id)
+
+    def _unindex(self, key: K) -> None:
+        self._shifts.pop(key, None)
+        caregiver = self._caregivers.pop(key, None)
+        if caregiver is None:
+            return
+        role, phone, caregiver_id = self._indexed.pop(key)
+        caregivers = self._caregivers_by_role.get(role)
+        if caregivers is not None:
+            caregivers.pop(key, None)
+            if not caregivers:
+                del self._caregivers_by_role[role]
+        if self._caregiver_by_phone.get(phone) is caregiver:
+            del self._caregiver_by_phone[phone]
+        if self._caregiver_by_id.get(caregiver_id) is caregiver:
+            del self._caregiver_by_id[caregiver_id]
+
+    def claim_shift(
+        self, key: K, claimer_id: str, claimed_at: datetime
     ) -> bool:
         """
         Atomically claim a shift if it's not already claimed.
         Returns True if claim succeeded, False if already claimed.
         """
-        value = self._store.get(key)
-        if value is None:
+        shift = self._shifts.get(key)
+        if shift is None:
             return False
         # Check and set in minimal window - dict access is atomic
-        if hasattr(value, "claimed") and not value.claimed:
-            value.claimed = True
-            if hasattr(value, "claimed_by"):
-                value.claimed_by = claimer_id
-            if hasattr(value, "claimed_at"):
-                value.claimed_at = claimed_at
-            self._store[key] = value
+        if not shift.claimed:
+            shift.claimed = True
+            shift.claimed_by = claimer_id
+            shift.claimed_at = claimed_at
             return True
         return False
@@ -1,20 +1,26 @@
 """
 Example domain models. Implement or replace as needed.
+
+These are plain slotted dataclasses rather than pydantic models: they are
+only built in-process and mutated on the claim/decline paths, so they skip
+validation and get direct slot attribute access. Pydantic stays at the HTTP
+boundary (see InboundMessageRequest in app.api).
 """
 
+from dataclasses import dataclass, field
 from datetime import datetime
 
-from pydantic import BaseModel, Field
-
 
-class Caregiver(BaseModel):
+@dataclass(slots=True)
+class Caregiver:
     id: str
     name: str
     role: str
     phone: str
 
 
-class Shift(BaseModel):
+@dataclass(slots=True)
+class Shift:
     id: str
     organization_id: str
     role_required: str
@@ -24,4 +30,9 @@ class Shift(BaseModel):
     claimed_by: str | None = None  # Caregiver ID
     claimed_at: datetime | None = None
     fanout_started_at: datetime | None = None
-    declined_caregiver_ids: list[str] = Field(default_factory=list)
+    # caregivers contacted in the sms round, reused for escalation;
+    # None until fanout_shift has run for this shift
+    fanout_caregiver_ids: list[str] | None = None
+    # outreach text built once at fanout, reused for the escalation round
+    notification_message: str | None = None
+    declined_caregiver_ids: set[str] = field(default_factory=set)
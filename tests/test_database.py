@@ -0,0 +1,70 @@
+from app.database import InMemoryKeyValueDatabase
+from app.models import Caregiver, Shift
+
+
+def _db() -> InMemoryKeyValueDatabase[str, Shift | Caregiver]:
+    return InMemoryKeyValueDatabase()
+
+
+def _caregiver(role: str = "RN") -> Caregiver:
+    return Caregiver(id="alice-id", name="Alice", role=role, phone="+15550001")
+
+
+def test_put_indexes_caregiver_by_role() -> None:
+    db = _db()
+    c = _caregiver()
+    db.put("caregiver:alice-id", c)
+
+    assert db.get_caregivers_by_role("RN") == [c]
+    assert db.get_caregivers_by_role("LPN") == []
+
+
+def test_reput_with_changed_role_moves_caregiver() -> None:
+    db = _db()
+    c = _caregiver()
+    db.put("caregiver:alice-id", c)
+
+    # same instance, mutated in place, then written back
+    c.role = "LPN"
+    db.put("caregiver:alice-id", c)
+
+    assert db.get_caregivers_by_role("RN") == []
+    assert db.get_caregivers_by_role("LPN") == [c]
+
+
+def test_delete_removes_caregiver_from_role_index() -> None:
+    db = _db()
+    c = _caregiver()
+    db.put("caregiver:alice-id", c)
+
+    c.role = "LPN"  # mutated but not re-put before the delete
+    db.delete("caregiver:alice-id")
+
+    assert len(db) == 0
+    assert db.get_caregivers_by_role("RN") == []
+    assert db.get_caregivers_by_role("LPN") == []
+    assert db.get_caregiver_by_id("alice-id") is None
+
+
+def test_reput_with_changed_phone_drops_old_phone() -> None:
+    db = _db()
+    c = _caregiver()
+    db.put("caregiver:alice-id", c)
+
+    c.phone = "+15559999"
+    db.put("caregiver:alice-id", c)
+
+    assert db.get_caregiver_by_phone("+15550001") is None
+    assert db.get_caregiver_by_phone("+15559999") is c
+
+
+def test_delete_removes_caregiver_from_phone_index() -> None:
+    db = _db()
+    c = _caregiver()
+    db.put("caregiver:alice-id", c)
+
+    c.phone = "+15559999"  # mutated but not re-put before the delete
+    db.delete("caregiver:alice-id")
+
+    assert db.get_caregiver_by_phone("+15550001") is None
+    assert db.get_caregiver_by_phone("+15559999") is None
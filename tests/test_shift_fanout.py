@@ -1,21 +1,37 @@
 import asyncio
+import copy
+import dataclasses
+import json
+import os
 from datetime import UTC, datetime, timedelta
-from unittest.mock import AsyncMock
+from operator import attrgetter
 
 import pytest
 import pytest_asyncio
+from fastapi import FastAPI
 from freezegun import freeze_time
 from httpx import ASGITransport, AsyncClient
 
 import app.api as api
-from app.api import create_app
+from app.api import (
+    InboundMessageRequest,
+    create_app,
+    handle_inbound_message,
+)
 from app.database import InMemoryKeyValueDatabase
 from app.models import Caregiver, Shift
 
+# diagnostic output is off by default; run with SHIFT_TEST_DEBUG=1 pytest -s
+DEBUG = bool(os.environ.get("SHIFT_TEST_DEBUG"))
+
+CLOCK_START = datetime(2025, 7, 2, 0, 0, 0, tzinfo=UTC)
+
+_ID = attrgetter("id")
+
 
 def _p(msg: str) -> None:
-    # pytest captures stdout unless you run with -s
-    print(msg, flush=True)  # noqa: T201
+    if DEBUG:
+        print(msg, flush=True)  # noqa: T201
 
 
 def _banner(name: str) -> None:
@@ -25,33 +41,33 @@ def _banner(name: str) -> None:
 
 
 def _dump_db(app, *, shift_id: str | None = None) -> None:
+    if not DEBUG:
+        return
+
     db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = app.state.database
-    caregivers: list[Caregiver] = [
-        c for c in db.all() if isinstance(c, Caregiver)
-    ]
-    shifts: list[Shift] = [s for s in db.all() if isinstance(s, Shift)]
+    caregivers = list(db.iter_caregivers())
+    shifts = list(db.iter_shifts())
 
     _p("db caregivers:")
-    for c in sorted(caregivers, key=lambda x: x.id):
+    for c in sorted(caregivers, key=_ID):
         _p(f"  - {c.id} | {c.name} | role={c.role} | phone={c.phone}")
 
     _p("db shifts:")
-    for s in sorted(shifts, key=lambda x: x.id):
+    for s in sorted(shifts, key=_ID):
         _p(
             f"  - {s.id} | role_required={s.role_required} | "
             f"claimed={s.claimed} claimed_by={s.claimed_by} "
             f"fanout_started_at={s.fanout_started_at} "
-            f"declined={list(s.declined_caregiver_ids)}"
+            f"declined={sorted(s.declined_caregiver_ids)}"
         )
 
     if shift_id is not None:
-        s = db.get(f"shift:{shift_id}")
-        if isinstance(s, Shift):
+        s = db.get_shift(f"shift:{shift_id}")
+        if s is not None:
             matching = [
                 c
-                for c in caregivers
-                if c.role == s.role_required
-                and c.id not in s.declined_caregiver_ids
+                for c in db.get_caregivers_by_role(s.role_required)
+                if c.id not in s.declined_caregiver_ids
             ]
             _p(f"computed matching caregivers for shift {shift_id}:")
             for c in matching:
@@ -60,37 +76,107 @@ def _dump_db(app, *, shift_id: str | None = None) -> None:
             _p(f"shift:{shift_id} not found in db")
 
 
-class FreezegunSleeper:
+def get_shift(
+    db: InMemoryKeyValueDatabase[str, Shift | Caregiver], shift_id: str
+) -> Shift:
+    shift = db.get_shift(f"shift:{shift_id}")
+    assert shift is not None, f"shift {shift_id} not found"
+    return shift
+
+
+class FakeClock:
     """
-    Fake sleep function that advances only when the test manually ticks
-    freezegun time forward, to simulate 10 minute wait.
+    Injected as the app's now_fn/sleep_fn. Time only moves when the test
+    ticks it forward, and sleepers wake once their deadline has passed, to
+    simulate the 10 minute wait.
     """
 
-    def __init__(self, frozen_time):
-        self.frozen_time = frozen_time
-        self._event = asyncio.Event()
+    def __init__(self, start: datetime) -> None:
+        self._now = start
+        # (deadline, future) per sleeper; tick() resolves the ones now due
+        self._pending: list[tuple[datetime, asyncio.Future[None]]] = []
+
+    def now(self) -> datetime:
+        return self._now
 
     def tick(self, *, delta: timedelta) -> None:
-        before = datetime.now(UTC)
-        self.frozen_time.tick(delta=delta)
-        after = datetime.now(UTC)
+        before = self._now
+        self._now += delta
         _p(
-            f"[time] ticked by {delta}. {before.isoformat()} -> {after.isoformat()}"
+            f"[time] ticked by {delta}. {before.isoformat()} -> {self._now.isoformat()}"
         )
-        self._event.set()
+
+        still_pending = []
+        for deadline, fut in self._pending:
+            if fut.done():  # sleeper was cancelled
+                continue
+            if deadline <= self._now:
+                fut.set_result(None)
+            else:
+                still_pending.append((deadline, fut))
+        self._pending = still_pending
 
     async def sleep(self, seconds: float) -> None:
-        start = datetime.now(UTC)
+        start = self._now
         deadline = start + timedelta(seconds=seconds)
         _p(
             f"[sleep] requested {seconds:.2f}s from {start.isoformat()} until {deadline.isoformat()}"
         )
 
-        while datetime.now(UTC) < deadline:
-            await self._event.wait()
-            self._event.clear()
+        if deadline > start:
+            fut = asyncio.get_running_loop().create_future()
+            self._pending.append((deadline, fut))
+            await fut
+
+        _p(f"[sleep] done at {self._now.isoformat()}")
+
+
+class AsyncRecorder:
+    """
+    Minimal stand-in for AsyncMock: records each awaited call as
+    (args, kwargs) and exposes the await_* attributes the tests assert on.
+    """
+
+    def __init__(self) -> None:
+        self.await_args_list: list[tuple[tuple, dict]] = []
 
-        _p(f"[sleep] done at {datetime.now(UTC).isoformat()}")
+    async def __call__(self, *args, **kwargs) -> None:
+        self.await_args_list.append((args, kwargs))
+
+    @property
+    def await_count(self) -> int:
+        return len(self.await_args_list)
+
+    @property
+    def await_args(self) -> tuple[tuple, dict] | None:
+        return self.await_args_list[-1] if self.await_args_list else None
+
+
+class InFlightRecorder(AsyncRecorder):
+    """
+    AsyncRecorder that yields to the loop inside each call, tracking how
+    many calls overlap and the peak number of live tasks, and raises for
+    phones listed in fail_for.
+    """
+
+    def __init__(self, fail_for: set[str] | None = None) -> None:
+        super().__init__()
+        self._fail_for = fail_for or set()
+        self._in_flight = 0
+        self.max_in_flight = 0
+        self.max_tasks = 0
+
+    async def __call__(self, *args, **kwargs) -> None:
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        self.max_tasks = max(self.max_tasks, len(asyncio.all_tasks()))
+        try:
+            await asyncio.sleep(0)
+            await super().__call__(*args, **kwargs)
+            if args[0] in self._fail_for:
+                raise RuntimeError(f"send to {args[0]} failed")
+        finally:
+            self._in_flight -= 1
 
 
 @pytest.fixture(autouse=True)
@@ -99,31 +185,129 @@ def notifier_mocks(monkeypatch):
     Patch api-level imports (api.py does `from app.notifier import ...`),
     so patching app.notifier.* would not affect the app.
     """
-    sms = AsyncMock(return_value=None)
-    call = AsyncMock(return_value=None)
+    sms = AsyncRecorder()
+    call = AsyncRecorder()
     monkeypatch.setattr(api, "send_sms", sms)
     monkeypatch.setattr(api, "place_phone_call", call)
     return sms, call
 
 
-@pytest_asyncio.fixture
-async def client():
-    app = create_app()
+@pytest.fixture(scope="session")
+def app() -> FastAPI:
+    """
+    One app for the whole session; reset_app restores it between tests.
+    """
+    return create_app()
+
+
+@pytest_asyncio.fixture(scope="session")
+async def client(app: FastAPI):
     async with AsyncClient(
         transport=ASGITransport(app=app), base_url="http://test"
     ) as async_client:
         yield async_client
 
-    # cancel any pending escalation tasks
-    tasks = []
-    if hasattr(app.state, "escalation_tasks"):
-        tasks = list(app.state.escalation_tasks)
 
-    for t in tasks:
-        t.cancel()
+@pytest.fixture(autouse=True)
+def clock(app: FastAPI):
+    """
+    Drive the app's time through a FakeClock instead of patching datetime.
+    """
+    now_fn, sleep_fn = app.state.now_fn, app.state.sleep_fn
+    fake = FakeClock(CLOCK_START)
+    app.state.now_fn = fake.now
+    app.state.sleep_fn = fake.sleep
+    yield fake
+    app.state.now_fn, app.state.sleep_fn = now_fn, sleep_fn
+
 
+@pytest_asyncio.fixture(autouse=True)
+async def reset_app(app: FastAPI):
+    """
+    Give each test a clean database and escalation state on the shared app.
+    """
+    yield
+
+    # cancel any pending escalation tasks; most tests never start one
+    tasks = list(app.state.escalation_tasks_by_shift.values())
     if tasks:
-        await asyncio.gather(*tasks, return_exceptions=True)
+        for t in tasks:
+            t.cancel()
+        # bounded wait so a stuck task fails the teardown instead of hanging
+        _, pending = await asyncio.wait(tasks, timeout=1)
+        assert not pending, f"escalation tasks did not stop: {pending}"
+        app.state.escalation_tasks_by_shift.clear()
+
+    app.state.database.clear()
+
+
+_SEED_CAREGIVERS: dict[str, Caregiver] = {
+    f"caregiver:{c.id}": c
+    for c in (
+        Caregiver(
+            id="alice-id",
+            name="Alice Ongwele",
+            role="RN",
+            phone="+15550001",
+        ),
+        Caregiver(
+            id="wei-id",
+            name="Wei Yan",
+            role="LPN",
+            phone="+15550002",
+        ),
+        Caregiver(
+            id="barry-id",
+            name="Barry Kozumikov",
+            role="LPN",
+            phone="+15550003",
+        ),
+    )
+}
+
+# shifts are mutated by fanout/claim/decline, so each test loads a deep copy
+_SEED_SHIFTS: dict[str, Shift] = {
+    f"shift:{s.id}": s
+    for s in (
+        Shift(
+            id="rn-shift-123",
+            organization_id="org-123",
+            role_required="RN",
+            start_time=datetime(2025, 7, 2, 8, 0, 0, tzinfo=UTC),
+            end_time=datetime(2025, 7, 2, 16, 0, 0, tzinfo=UTC),
+        ),
+        Shift(
+            id="lpn-shift-456",
+            organization_id="org-123",
+            role_required="LPN",
+            start_time=datetime(2025, 7, 2, 16, 0, 0, tzinfo=UTC),
+            end_time=datetime(2025, 7, 3, 0, 0, 0, tzinfo=UTC),
+        ),
+    )
+}
+
+
+# inbound payloads are serialized once and posted as raw bytes
+_JSON_HEADERS = {"content-type": "application/json"}
+
+_UNKNOWN_PHONE_YES = json.dumps(
+    {"from": "+15559999", "body": "yes", "shift_id": "rn-shift-123"}
+).encode()
+_ALICE_YES_UNKNOWN_SHIFT = json.dumps(
+    {"from": "+15550001", "body": "yes", "shift_id": "nope"}
+).encode()
+_ALICE_YES_NO_SHIFT_ID = json.dumps(
+    {"from": "+15550001", "body": "yes"}
+).encode()
+_ALICE_YES = json.dumps(
+    {"from": "+15550001", "body": "yes", "shift_id": "rn-shift-123"}
+).encode()
+_WEI_NO = json.dumps(
+    {"from": "+15550002", "body": "no", "shift_id": "lpn-shift-456"}
+).encode()
+_WEI_YES = json.dumps(
+    {"from": "+15550002", "body": "yes", "shift_id": "lpn-shift-456"}
+).encode()
 
 
 @pytest_asyncio.fixture
@@ -131,65 +315,30 @@ async def setup_test_data(client: AsyncClient):
     app = client._transport.app
     db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = app.state.database
 
-    alice = Caregiver(
-        id="alice-id",
-        name="Alice Ongwele",
-        role="RN",
-        phone="+15550001",
-    )
-    wei = Caregiver(
-        id="wei-id",
-        name="Wei Yan",
-        role="LPN",
-        phone="+15550002",
-    )
-    barry = Caregiver(
-        id="barry-id",
-        name="Barry Kozumikov",
-        role="LPN",
-        phone="+15550003",
-    )
-
-    rn_shift = Shift(
-        id="rn-shift-123",
-        organization_id="org-123",
-        role_required="RN",
-        start_time=datetime(2025, 7, 2, 8, 0, 0, tzinfo=UTC),
-        end_time=datetime(2025, 7, 2, 16, 0, 0, tzinfo=UTC),
-    )
-    lpn_shift = Shift(
-        id="lpn-shift-456",
-        organization_id="org-123",
-        role_required="LPN",
-        start_time=datetime(2025, 7, 2, 16, 0, 0, tzinfo=UTC),
-        end_time=datetime(2025, 7, 3, 0, 0, 0, tzinfo=UTC),
-    )
-
-    db.put(f"caregiver:{alice.id}", alice)
-    db.put(f"caregiver:{wei.id}", wei)
-    db.put(f"caregiver:{barry.id}", barry)
-    db.put(f"shift:{rn_shift.id}", rn_shift)
-    db.put(f"shift:{lpn_shift.id}", lpn_shift)
+    db.bulk_load(_SEED_CAREGIVERS)
+    db.bulk_load(copy.deepcopy(_SEED_SHIFTS))
 
 
 @pytest.mark.asyncio
 async def test_health_check(client: AsyncClient) -> None:
     _banner("health_check returns ok")
     resp = await client.get("/health")
-    _p(f"GET /health -> status={resp.status_code}, body={resp.json()}")
+    data = resp.json()
+    _p(f"GET /health -> status={resp.status_code}, body={data}")
     assert resp.status_code == 200
-    assert resp.json() == {"status": "ok"}
+    assert data == {"status": "ok"}
 
 
 @pytest.mark.asyncio
 async def test_fanout_shift_not_found(client: AsyncClient) -> None:
     _banner("fanout_shift returns 404 for missing shift")
     resp = await client.post("/shifts/nonexistent/fanout")
+    data = resp.json()
     _p(
-        f"POST /shifts/nonexistent/fanout -> status={resp.status_code}, body={resp.json()}"
+        f"POST /shifts/nonexistent/fanout -> status={resp.status_code}, body={data}"
     )
     assert resp.status_code == 404
-    assert "not found" in resp.json()["detail"].lower()
+    assert "not found" in data["detail"].lower()
 
 
 @pytest.mark.asyncio
@@ -201,33 +350,31 @@ async def test_fanout_filters_by_role_for_sms(
     app = client._transport.app
     _dump_db(app, shift_id="rn-shift-123")
 
-    with freeze_time("2025-07-02 00:00:00", real_asyncio=True):
-        _p(f"[time] now={datetime.now(UTC).isoformat()}")
-        resp = await client.post("/shifts/rn-shift-123/fanout")
-        _p(
-            f"POST /shifts/rn-shift-123/fanout -> status={resp.status_code}, body={resp.json()}"
-        )
+    _p(f"[time] now={app.state.now_fn().isoformat()}")
+    resp = await client.post("/shifts/rn-shift-123/fanout")
+    data = resp.json()
+    _p(
+        f"POST /shifts/rn-shift-123/fanout -> status={resp.status_code}, body={data}"
+    )
 
-        _p(f"sms calls made: {sms_mock.await_count}")
-        if sms_mock.await_count:
-            for i, (args, _kw) in enumerate(sms_mock.await_args_list, start=1):
-                phone, msg = args
-                _p(f"  sms[{i}] -> phone={phone}, msg='{msg}'")
+    _p(f"sms calls made: {sms_mock.await_count}")
+    if sms_mock.await_count:
+        for i, (args, _kw) in enumerate(sms_mock.await_args_list, start=1):
+            phone, msg = args
+            _p(f"  sms[{i}] -> phone={phone}, msg='{msg}'")
 
-        _p(
-            f"phone calls made (should be 0 before tick): {call_mock.await_count}"
-        )
+    _p(f"phone calls made (should be 0 before tick): {call_mock.await_count}")
 
-        assert resp.status_code == 200
+    assert resp.status_code == 200
 
-        # sms only to RN (alice)
-        assert sms_mock.await_count == 1
-        (phone, message), _ = sms_mock.await_args
-        assert phone == "+15550001"
-        assert "rn-shift-123" in message.lower()
+    # sms only to RN (alice)
+    assert sms_mock.await_count == 1
+    (phone, message), _ = sms_mock.await_args
+    assert phone == "+15550001"
+    assert "rn-shift-123" in message.lower()
 
-        # should NOT have escalated yet (we didn't tick 10 minutes)
-        assert call_mock.await_count == 0
+    # should NOT have escalated yet (we didn't tick 10 minutes)
+    assert call_mock.await_count == 0
 
 
 @pytest.mark.asyncio
@@ -239,21 +386,88 @@ async def test_fanout_contacts_all_matching_role_for_sms(
     app = client._transport.app
     _dump_db(app, shift_id="lpn-shift-456")
 
-    with freeze_time("2025-07-02 00:00:00", real_asyncio=True):
-        resp = await client.post("/shifts/lpn-shift-456/fanout")
-        _p(
-            f"POST /shifts/lpn-shift-456/fanout -> status={resp.status_code}, body={resp.json()}"
+    resp = await client.post("/shifts/lpn-shift-456/fanout")
+    data = resp.json()
+    _p(
+        f"POST /shifts/lpn-shift-456/fanout -> status={resp.status_code}, body={data}"
+    )
+
+    _p(f"sms calls made: {sms_mock.await_count}")
+    for i, (args, _kw) in enumerate(sms_mock.await_args_list, start=1):
+        phone, msg = args
+        _p(f"  sms[{i}] -> phone={phone}, msg='{msg}'")
+
+    assert resp.status_code == 200
+    assert sms_mock.await_count == 2
+    phones = {args[0] for (args, _) in sms_mock.await_args_list}
+    assert phones == {"+15550002", "+15550003"}
+
+
+def _add_rns(
+    db: InMemoryKeyValueDatabase[str, Shift | Caregiver], count: int
+) -> None:
+    for i in range(count):
+        cg = Caregiver(
+            id=f"rn-{i}-id",
+            name=f"RN {i}",
+            role="RN",
+            phone=f"+1555100{i:04d}",
         )
+        db.put(f"caregiver:{cg.id}", cg)
 
-        _p(f"sms calls made: {sms_mock.await_count}")
-        for i, (args, _kw) in enumerate(sms_mock.await_args_list, start=1):
-            phone, msg = args
-            _p(f"  sms[{i}] -> phone={phone}, msg='{msg}'")
 
-        assert resp.status_code == 200
-        assert sms_mock.await_count == 2
-        phones = sorted([args[0] for (args, _) in sms_mock.await_args_list])
-        assert phones == ["+15550002", "+15550003"]
+@pytest.mark.asyncio
+async def test_fanout_caps_sms_in_flight(
+    client: AsyncClient, setup_test_data, monkeypatch
+) -> None:
+    _banner("fanout sends sms to every caregiver, capped in flight")
+    sms_mock = InFlightRecorder()
+    monkeypatch.setattr(api, "send_sms", sms_mock)
+    app = client._transport.app
+    db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = app.state.database
+
+    extra = api.NOTIFY_CONCURRENCY * 2
+    _add_rns(db, extra)
+    _p(f"added {extra} extra RNs (limit {api.NOTIFY_CONCURRENCY})")
+
+    tasks_before = len(asyncio.all_tasks())
+    resp = await client.post("/shifts/rn-shift-123/fanout")
+    data = resp.json()
+    _p(
+        f"POST /shifts/rn-shift-123/fanout -> status={resp.status_code}, body={data}"
+    )
+    _p(f"max sms in flight: {sms_mock.max_in_flight}")
+    _p(f"max live tasks: {sms_mock.max_tasks} (before: {tasks_before})")
+
+    assert resp.status_code == 200
+    assert data["qualifying_caregivers"] == extra + 1
+    assert sms_mock.await_count == extra + 1
+    assert sms_mock.max_in_flight == api.NOTIFY_CONCURRENCY
+    assert sms_mock.max_tasks - tasks_before <= api.NOTIFY_CONCURRENCY
+
+
+@pytest.mark.asyncio
+async def test_fanout_failed_sms_does_not_stop_the_rest(
+    client: AsyncClient, setup_test_data, monkeypatch
+) -> None:
+    _banner("one failing sms doesn't block the others or the escalation")
+    sms_mock = InFlightRecorder(fail_for={"+15550001"})
+    monkeypatch.setattr(api, "send_sms", sms_mock)
+    app = client._transport.app
+    db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = app.state.database
+
+    extra = api.NOTIFY_CONCURRENCY * 3
+    _add_rns(db, extra)
+
+    resp = await client.post("/shifts/rn-shift-123/fanout")
+    data = resp.json()
+    _p(
+        f"POST /shifts/rn-shift-123/fanout -> status={resp.status_code}, body={data}"
+    )
+
+    assert resp.status_code == 200
+    assert sms_mock.await_count == extra + 1
+    assert "rn-shift-123" in app.state.escalation_tasks_by_shift
 
 
 @pytest.mark.asyncio
@@ -266,30 +480,51 @@ async def test_fanout_idempotent_no_duplicate_sms(
     sms_mock, _ = notifier_mocks
     app = client._transport.app
 
-    with freeze_time("2025-07-02 00:00:00", real_asyncio=True):
-        r1 = await client.post("/shifts/rn-shift-123/fanout")
-        _p(f"first fanout -> status={r1.status_code}, body={r1.json()}")
-        _p(f"sms await_count after first fanout: {sms_mock.await_count}")
-        _p(
-            f"escalation tasks count after first fanout: {len(app.state.escalation_tasks)}"
-        )
+    r1 = await client.post("/shifts/rn-shift-123/fanout")
+    data1 = r1.json()
+    _p(f"first fanout -> status={r1.status_code}, body={data1}")
+    _p(f"sms await_count after first fanout: {sms_mock.await_count}")
+    _p(
+        f"escalation tasks count after first fanout: {len(app.state.escalation_tasks_by_shift)}"
+    )
 
-        r2 = await client.post("/shifts/rn-shift-123/fanout")
-        _p(f"second fanout -> status={r2.status_code}, body={r2.json()}")
-        _p(f"sms await_count after second fanout: {sms_mock.await_count}")
-        _p(
-            f"escalation tasks count after second fanout: {len(app.state.escalation_tasks)}"
-        )
+    r2 = await client.post("/shifts/rn-shift-123/fanout")
+    data2 = r2.json()
+    _p(f"second fanout -> status={r2.status_code}, body={data2}")
+    _p(f"sms await_count after second fanout: {sms_mock.await_count}")
+    _p(
+        f"escalation tasks count after second fanout: {len(app.state.escalation_tasks_by_shift)}"
+    )
 
-        assert r1.status_code == 200
-        assert sms_mock.await_count == 1
-        assert len(app.state.escalation_tasks) == 1
+    assert r1.status_code == 200
+    assert sms_mock.await_count == 1
+    assert len(app.state.escalation_tasks_by_shift) == 1
 
-        assert r2.status_code == 200
-        data2 = r2.json()
-        assert data2["status"] == "already_fanout"
-        assert sms_mock.await_count == 1
-        assert len(app.state.escalation_tasks) == 1
+    assert r2.status_code == 200
+    assert data2["status"] == "already_fanout"
+    assert data2["fanout_started_at"] == data1["fanout_started_at"]
+    assert sms_mock.await_count == 1
+    assert len(app.state.escalation_tasks_by_shift) == 1
+
+
+@pytest.mark.asyncio
+async def test_fanout_already_started_elsewhere_returns_start_time(
+    client: AsyncClient, setup_test_data, notifier_mocks
+) -> None:
+    _banner("fanout on a shift stored with fanout_started_at already set")
+    sms_mock, _ = notifier_mocks
+    app = client._transport.app
+    started_at = CLOCK_START - timedelta(minutes=3)
+    get_shift(app.state.database, "rn-shift-123").fanout_started_at = started_at
+
+    resp = await client.post("/shifts/rn-shift-123/fanout")
+    data = resp.json()
+    _p(f"fanout -> status={resp.status_code}, body={data}")
+
+    assert resp.status_code == 200
+    assert data["status"] == "already_fanout"
+    assert data["fanout_started_at"] == started_at.isoformat()
+    assert sms_mock.await_count == 0
 
 
 @pytest.mark.asyncio
@@ -299,13 +534,38 @@ async def test_inbound_message_caregiver_not_found(
     _banner("inbound accept fails if caregiver phone is unknown")
     resp = await client.post(
         "/messages/inbound",
-        json={"from": "+15559999", "body": "yes", "shift_id": "rn-shift-123"},
+        content=_UNKNOWN_PHONE_YES,
+        headers=_JSON_HEADERS,
+    )
+    data = resp.json()
+    _p(
+        f"POST /messages/inbound (unknown phone) -> status={resp.status_code}, body={data}"
+    )
+    assert resp.status_code == 404
+    assert "caregiver" in data["detail"].lower()
+
+
+@pytest.mark.asyncio
+async def test_inbound_message_deleted_caregiver_not_found(
+    client: AsyncClient, setup_test_data
+) -> None:
+    _banner("inbound accept fails once the caregiver has been deleted")
+    app = client._transport.app
+    db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = app.state.database
+    db.delete("caregiver:alice-id")
+
+    resp = await client.post(
+        "/messages/inbound",
+        content=_ALICE_YES,
+        headers=_JSON_HEADERS,
     )
+    data = resp.json()
     _p(
-        f"POST /messages/inbound (unknown phone) -> status={resp.status_code}, body={resp.json()}"
+        f"POST /messages/inbound (deleted caregiver) -> status={resp.status_code}, body={data}"
     )
     assert resp.status_code == 404
-    assert "caregiver" in resp.json()["detail"].lower()
+    assert "caregiver" in data["detail"].lower()
+    assert not get_shift(db, "rn-shift-123").claimed
 
 
 @pytest.mark.asyncio
@@ -315,13 +575,87 @@ async def test_inbound_message_shift_not_found(
     _banner("inbound accept fails if shift is unknown")
     resp = await client.post(
         "/messages/inbound",
-        json={"from": "+15550001", "body": "yes", "shift_id": "nope"},
+        content=_ALICE_YES_UNKNOWN_SHIFT,
+        headers=_JSON_HEADERS,
     )
+    data = resp.json()
     _p(
-        f"POST /messages/inbound (unknown shift) -> status={resp.status_code}, body={resp.json()}"
+        f"POST /messages/inbound (unknown shift) -> status={resp.status_code}, body={data}"
     )
     assert resp.status_code == 404
-    assert "shift" in resp.json()["detail"].lower()
+    assert "shift" in data["detail"].lower()
+
+
+@pytest.mark.asyncio
+async def test_inbound_message_invalid_payload(
+    client: AsyncClient, setup_test_data
+) -> None:
+    _banner("inbound message with missing fields is rejected with 422")
+    resp = await client.post(
+        "/messages/inbound",
+        content=_ALICE_YES_NO_SHIFT_ID,
+        headers=_JSON_HEADERS,
+    )
+    data = resp.json()
+    _p(
+        f"POST /messages/inbound (no shift_id) -> status={resp.status_code}, body={data}"
+    )
+    assert resp.status_code == 422
+    assert data["detail"][0]["loc"] == ["body", "shift_id"]
+
+
+@pytest.mark.asyncio
+async def test_inbound_message_rejects_bodies_fastapi_would(
+    client: AsyncClient, setup_test_data
+) -> None:
+    _banner("inbound rejects malformed, empty and non-json bodies")
+    malformed = await client.post(
+        "/messages/inbound", content=b'{"from": "+1",', headers=_JSON_HEADERS
+    )
+    empty = await client.post(
+        "/messages/inbound", content=b"", headers=_JSON_HEADERS
+    )
+    text = await client.post(
+        "/messages/inbound",
+        content=_ALICE_YES,
+        headers={"content-type": "text/plain"},
+    )
+    field_name = await client.post(
+        "/messages/inbound",
+        content=json.dumps(
+            {"from_": "+15550001", "body": "yes", "shift_id": "rn-shift-123"}
+        ).encode(),
+        headers=_JSON_HEADERS,
+    )
+    not_utf8 = await client.post(
+        "/messages/inbound",
+        content=b'{"from": "\xff", "body": "yes", "shift_id": "rn-shift-123"}',
+        headers=_JSON_HEADERS,
+    )
+
+    assert malformed.status_code == 422
+    assert malformed.json()["detail"][0]["loc"] == ["body", 14]
+    assert malformed.json()["detail"][0]["msg"] == "JSON decode error"
+    assert empty.status_code == 422
+    assert empty.json()["detail"][0]["type"] == "missing"
+    assert text.status_code == 422
+    assert text.json()["detail"][0]["type"] == "model_attributes_type"
+    assert field_name.status_code == 422
+    assert field_name.json()["detail"][0]["loc"] == ["body", "from"]
+    assert not_utf8.status_code == 400
+    assert not_utf8.json() == {"detail": "There was an error parsing the body"}
+
+    app = client._transport.app
+    assert not get_shift(app.state.database, "rn-shift-123").claimed
+
+
+def test_inbound_message_documents_request_body(app: FastAPI) -> None:
+    openapi = app.openapi()
+    operation = openapi["paths"]["/messages/inbound"]["post"]
+    schema = operation["requestBody"]["content"]["application/json"]["schema"]
+    assert schema == {"$ref": "#/components/schemas/InboundMessageRequest"}
+    assert "InboundMessageRequest" in openapi["components"]["schemas"]
+    assert "422" in operation["responses"]
 
 
 @pytest.mark.asyncio
@@ -332,36 +666,31 @@ async def test_accept_claims_shift_and_sets_fields(
     app = client._transport.app
     db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = app.state.database
 
-    with freeze_time("2025-07-02 00:00:00", real_asyncio=True):
-        _p("triggering fanout first...")
-        await client.post("/shifts/rn-shift-123/fanout")
-        _dump_db(app, shift_id="rn-shift-123")
-
-        _p("alice replies YES to accept")
-        resp = await client.post(
-            "/messages/inbound",
-            json={
-                "from": "+15550001",
-                "body": "yes",
-                "shift_id": "rn-shift-123",
-            },
-        )
-        _p(f"inbound accept -> status={resp.status_code}, body={resp.json()}")
+    _p("triggering fanout first...")
+    await client.post("/shifts/rn-shift-123/fanout")
+    _dump_db(app, shift_id="rn-shift-123")
 
-        shift = db.get("shift:rn-shift-123")
-        assert isinstance(shift, Shift)
-        _p(
-            "db shift after accept:\n"
-            f"  claimed={shift.claimed} claimed_by={shift.claimed_by} claimed_at={shift.claimed_at}"
-        )
+    _p("alice replies YES to accept")
+    resp = await client.post(
+        "/messages/inbound",
+        content=_ALICE_YES,
+        headers=_JSON_HEADERS,
+    )
+    data = resp.json()
+    _p(f"inbound accept -> status={resp.status_code}, body={data}")
 
-        assert resp.status_code == 200
-        data = resp.json()
-        assert data["status"] == "claimed"
-        assert data["caregiver_id"] == "alice-id"
-        assert shift.claimed is True
-        assert shift.claimed_by == "alice-id"
-        assert shift.claimed_at is not None
+    shift = get_shift(db, "rn-shift-123")
+    _p(
+        "db shift after accept:\n"
+        f"  claimed={shift.claimed} claimed_by={shift.claimed_by} claimed_at={shift.claimed_at}"
+    )
+
+    assert resp.status_code == 200
+    assert data["status"] == "claimed"
+    assert data["caregiver_id"] == "alice-id"
+    assert shift.claimed is True
+    assert shift.claimed_by == "alice-id"
+    assert shift.claimed_at is not None
 
 
 @pytest.mark.asyncio
@@ -382,41 +711,33 @@ async def test_only_one_caregiver_can_claim_even_if_two_accept(
     _p("added second RN: eve")
     _dump_db(app, shift_id="rn-shift-123")
 
-    with freeze_time("2025-07-02 00:00:00", real_asyncio=True):
-        _p("triggering fanout...")
-        await client.post("/shifts/rn-shift-123/fanout")
-
-        _p("simultaneous accepts: alice + eve")
-        r1, r2 = await asyncio.gather(
-            client.post(
-                "/messages/inbound",
-                json={
-                    "from": "+15550001",
-                    "body": "yes",
-                    "shift_id": "rn-shift-123",
-                },
-            ),
-            client.post(
-                "/messages/inbound",
-                json={
-                    "from": "+15550004",
-                    "body": "yes",
-                    "shift_id": "rn-shift-123",
-                },
-            ),
-        )
-        _p(f"alice response: {r1.json()}")
-        _p(f"eve response:   {r2.json()}")
+    _p("triggering fanout...")
+    await client.post("/shifts/rn-shift-123/fanout")
 
-        statuses = sorted([r1.json()["status"], r2.json()["status"]])
-        _p(f"statuses: {statuses} (expect one claimed, one already_claimed)")
-        assert statuses == ["already_claimed", "claimed"]
+    # the race is inside the db claim, so call the handler directly and skip
+    # the http round-trips
+    _p("simultaneous accepts: alice + eve")
+    alice_yes = InboundMessageRequest.model_validate(
+        {"from": "+15550001", "body": "yes", "shift_id": "rn-shift-123"}
+    )
+    eve_yes = InboundMessageRequest.model_validate(
+        {"from": "+15550004", "body": "yes", "shift_id": "rn-shift-123"}
+    )
+    r1, r2 = await asyncio.gather(
+        handle_inbound_message(app.state, alice_yes),
+        handle_inbound_message(app.state, eve_yes),
+    )
+    _p(f"alice response: {r1}")
+    _p(f"eve response:   {r2}")
 
-        shift = db.get("shift:rn-shift-123")
-        assert isinstance(shift, Shift)
-        _p(f"winner in db: claimed_by={shift.claimed_by}")
-        assert shift.claimed is True
-        assert shift.claimed_by in {"alice-id", "eve-id"}
+    statuses = sorted([r1["status"], r2["status"]])
+    _p(f"statuses: {statuses} (expect one claimed, one already_claimed)")
+    assert statuses == ["already_claimed", "claimed"]
+
+    shift = get_shift(db, "rn-shift-123")
+    _p(f"winner in db: claimed_by={shift.claimed_by}")
+    assert shift.claimed is True
+    assert shift.claimed_by in {"alice-id", "eve-id"}
 
 
 @pytest.mark.asyncio
@@ -427,160 +748,195 @@ async def test_decline_is_tracked_on_shift(
     app = client._transport.app
     db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = app.state.database
 
-    with freeze_time("2025-07-02 00:00:00", real_asyncio=True):
-        await client.post("/shifts/lpn-shift-456/fanout")
-        _dump_db(app, shift_id="lpn-shift-456")
-
-        _p("wei replies NO to decline")
-        resp = await client.post(
-            "/messages/inbound",
-            json={
-                "from": "+15550002",
-                "body": "no",
-                "shift_id": "lpn-shift-456",
-            },
-        )
-        _p(f"inbound decline -> status={resp.status_code}, body={resp.json()}")
+    await client.post("/shifts/lpn-shift-456/fanout")
+    _dump_db(app, shift_id="lpn-shift-456")
 
-        shift = db.get("shift:lpn-shift-456")
-        assert isinstance(shift, Shift)
-        _p(
-            f"db declined_caregiver_ids now: {list(shift.declined_caregiver_ids)}"
-        )
+    _p("wei replies NO to decline")
+    resp = await client.post(
+        "/messages/inbound",
+        content=_WEI_NO,
+        headers=_JSON_HEADERS,
+    )
+    data = resp.json()
+    _p(f"inbound decline -> status={resp.status_code}, body={data}")
+
+    shift = get_shift(db, "lpn-shift-456")
+    _p(f"db declined_caregiver_ids now: {sorted(shift.declined_caregiver_ids)}")
 
-        assert resp.status_code == 200
-        assert resp.json()["status"] == "not_claimed"
-        assert "wei-id" in shift.declined_caregiver_ids
+    assert resp.status_code == 200
+    assert data["status"] == "not_claimed"
+    assert "wei-id" in shift.declined_caregiver_ids
 
 
 @pytest.mark.asyncio
 async def test_escalation_waits_full_10_minutes_then_calls(
-    client: AsyncClient, setup_test_data, notifier_mocks
+    client: AsyncClient, setup_test_data, notifier_mocks, clock: FakeClock
 ) -> None:
     _banner("escalation waits 10 minutes, then places phone calls")
     _, call_mock = notifier_mocks
     app = client._transport.app
 
-    with freeze_time("2025-07-02 00:00:00", real_asyncio=True) as frozen:
-        sleeper = FreezegunSleeper(frozen)
-        app.state.now_fn = lambda: datetime.now(UTC)
-        app.state.sleep_fn = sleeper.sleep
+    _p(
+        "triggering fanout for LPN shift (should set up escalation background task)"
+    )
+    await client.post("/shifts/lpn-shift-456/fanout")
+    _dump_db(app, shift_id="lpn-shift-456")
+    task = app.state.escalation_tasks_by_shift["lpn-shift-456"]
 
-        _p(
-            "triggering fanout for LPN shift (should set up escalation background task)"
-        )
-        await client.post("/shifts/lpn-shift-456/fanout")
-        _dump_db(app, shift_id="lpn-shift-456")
-
-        # let background task start and enter sleep()
-        await asyncio.sleep(0)
-        _p(f"call await_count immediately: {call_mock.await_count}")
-
-        _p("advance time by 9 minutes (should still be no calls)")
-        sleeper.tick(delta=timedelta(minutes=9))
-        await asyncio.sleep(0)
-        _p(f"call await_count at +9m: {call_mock.await_count}")
-        assert call_mock.await_count == 0
-
-        _p("advance time by 1 more minute (hit +10m => should call both LPNs)")
-        sleeper.tick(delta=timedelta(minutes=1))
-        await asyncio.sleep(0)
-        await asyncio.sleep(0)  # let gather complete
-
-        _p(f"call await_count at +10m: {call_mock.await_count}")
-        for i, (args, _kw) in enumerate(call_mock.await_args_list, start=1):
-            phone, msg = args
-            _p(f"  call[{i}] -> phone={phone}, msg='{msg}'")
+    # let background task start and enter sleep()
+    await asyncio.sleep(0)
+    _p(f"call await_count immediately: {call_mock.await_count}")
 
-        assert call_mock.await_count == 2
-        phones = sorted([args[0] for (args, _) in call_mock.await_args_list])
-        assert phones == ["+15550002", "+15550003"]
+    _p("advance time by 9 minutes (should still be no calls)")
+    clock.tick(delta=timedelta(minutes=9))
+    await asyncio.sleep(0)
+    _p(f"call await_count at +9m: {call_mock.await_count}")
+    assert call_mock.await_count == 0
+
+    _p("advance time by 1 more minute (hit +10m => should call both LPNs)")
+    clock.tick(delta=timedelta(minutes=1))
+    await asyncio.wait({task}, timeout=1)
+
+    _p(f"call await_count at +10m: {call_mock.await_count}")
+    for i, (args, _kw) in enumerate(call_mock.await_args_list, start=1):
+        phone, msg = args
+        _p(f"  call[{i}] -> phone={phone}, msg='{msg}'")
+
+    assert call_mock.await_count == 2
+    phones = {args[0] for (args, _) in call_mock.await_args_list}
+    assert phones == {"+15550002", "+15550003"}
 
 
 @pytest.mark.asyncio
 async def test_escalation_excludes_declined_caregivers(
-    client: AsyncClient, setup_test_data, notifier_mocks
+    client: AsyncClient, setup_test_data, notifier_mocks, clock: FakeClock
 ) -> None:
     _banner("escalation excludes caregivers who declined before 10 minutes")
     _, call_mock = notifier_mocks
     app = client._transport.app
 
-    with freeze_time("2025-07-02 00:00:00", real_asyncio=True) as frozen:
-        sleeper = FreezegunSleeper(frozen)
-        app.state.now_fn = lambda: datetime.now(UTC)
-        app.state.sleep_fn = sleeper.sleep
-
-        await client.post("/shifts/lpn-shift-456/fanout")
-        await asyncio.sleep(0)
-
-        _p("wei declines before the 10-minute mark")
-        await client.post(
-            "/messages/inbound",
-            json={
-                "from": "+15550002",
-                "body": "no",
-                "shift_id": "lpn-shift-456",
-            },
-        )
-        _dump_db(app, shift_id="lpn-shift-456")
+    await client.post("/shifts/lpn-shift-456/fanout")
+    task = app.state.escalation_tasks_by_shift["lpn-shift-456"]
+    await asyncio.sleep(0)
+
+    _p("wei declines before the 10-minute mark")
+    await client.post(
+        "/messages/inbound",
+        content=_WEI_NO,
+        headers=_JSON_HEADERS,
+    )
+    _dump_db(app, shift_id="lpn-shift-456")
 
-        _p("advance time by +10m (should call only barry)")
-        sleeper.tick(delta=timedelta(minutes=10))
-        await asyncio.sleep(0)
-        await asyncio.sleep(0)
+    _p("advance time by +10m (should call only barry)")
+    clock.tick(delta=timedelta(minutes=10))
+    await asyncio.wait({task}, timeout=1)
 
-        _p(f"call await_count: {call_mock.await_count}")
-        for i, (args, _kw) in enumerate(call_mock.await_args_list, start=1):
-            phone, msg = args
-            _p(f"  call[{i}] -> phone={phone}, msg='{msg}'")
+    _p(f"call await_count: {call_mock.await_count}")
+    for i, (args, _kw) in enumerate(call_mock.await_args_list, start=1):
+        phone, msg = args
+        _p(f"  call[{i}] -> phone={phone}, msg='{msg}'")
 
-        assert call_mock.await_count == 1
-        (phone, _msg), _ = call_mock.await_args
-        assert phone == "+15550003"
+    assert call_mock.await_count == 1
+    (phone, _msg), _ = call_mock.await_args
+    assert phone == "+15550003"
+
+
+@pytest.mark.asyncio
+async def test_escalation_skips_caregivers_whose_role_changed(
+    client: AsyncClient, setup_test_data, notifier_mocks, clock: FakeClock
+) -> None:
+    _banner("escalation skips caregivers who no longer have the role")
+    _, call_mock = notifier_mocks
+    app = client._transport.app
+    db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = app.state.database
+
+    await client.post("/shifts/lpn-shift-456/fanout")
+    task = app.state.escalation_tasks_by_shift["lpn-shift-456"]
+    await asyncio.sleep(0)
+
+    _p("wei becomes an RN after the sms round")
+    # replace rather than mutate: the seed caregivers are shared by tests
+    wei = db.get_caregiver_by_id("wei-id")
+    assert wei is not None
+    db.put("caregiver:wei-id", dataclasses.replace(wei, role="RN"))
+
+    clock.tick(delta=timedelta(minutes=10))
+    await asyncio.wait({task}, timeout=1)
+
+    assert call_mock.await_count == 1
+    (phone, _msg), _ = call_mock.await_args
+    assert phone == "+15550003"
+
+
+@pytest.mark.asyncio
+async def test_escalation_without_sms_round_rebuilds_recipients_and_message(
+    client: AsyncClient, setup_test_data, notifier_mocks, clock: FakeClock
+) -> None:
+    _banner("escalation on a shift fanout_shift never stamped")
+    _, call_mock = notifier_mocks
+    app = client._transport.app
+    db: InMemoryKeyValueDatabase[str, Shift | Caregiver] = app.state.database
+
+    shift = get_shift(db, "lpn-shift-456")
+    shift.fanout_started_at = CLOCK_START
+    shift.declined_caregiver_ids.add("wei-id")
+    assert shift.fanout_caregiver_ids is None
+    assert shift.notification_message is None
+
+    task = asyncio.create_task(
+        api.escalate_if_unfilled(
+            "lpn-shift-456", db, now_fn=clock.now, sleep_fn=clock.sleep
+        )
+    )
+    await asyncio.sleep(0)
+    clock.tick(delta=timedelta(minutes=10))
+    await asyncio.wait({task}, timeout=1)
+
+    assert call_mock.await_count == 1
+    (phone, msg), _ = call_mock.await_args
+    assert phone == "+15550003"
+    assert "lpn-shift-456" in msg
 
 
 @pytest.mark.asyncio
 async def test_escalation_is_cancelled_when_shift_is_claimed(
-    client: AsyncClient, setup_test_data, notifier_mocks
+    client: AsyncClient, setup_test_data, notifier_mocks, clock: FakeClock
 ) -> None:
     _banner("escalation is cancelled when shift gets claimed before 10 minutes")
     _, call_mock = notifier_mocks
     app = client._transport.app
 
-    with freeze_time("2025-07-02 00:00:00", real_asyncio=True) as frozen:
-        sleeper = FreezegunSleeper(frozen)
-        app.state.now_fn = lambda: datetime.now(UTC)
-        app.state.sleep_fn = sleeper.sleep
-
-        await client.post("/shifts/lpn-shift-456/fanout")
-        await asyncio.sleep(0)
-
-        _p("advance time +5m, then claim shift")
-        sleeper.tick(delta=timedelta(minutes=5))
-        await asyncio.sleep(0)
-
-        await client.post(
-            "/messages/inbound",
-            json={
-                "from": "+15550002",
-                "body": "yes",
-                "shift_id": "lpn-shift-456",
-            },
-        )
-        _dump_db(app, shift_id="lpn-shift-456")
+    await client.post("/shifts/lpn-shift-456/fanout")
+    task = app.state.escalation_tasks_by_shift["lpn-shift-456"]
+    await asyncio.sleep(0)
 
-        _p(
-            "advance time another +5m (reach +10m). should still be 0 phone calls."
-        )
-        sleeper.tick(delta=timedelta(minutes=5))
-        await asyncio.sleep(0)
-        await asyncio.sleep(0)
-
-        _p(f"call await_count: {call_mock.await_count}")
-        assert call_mock.await_count == 0
-
-        task = app.state.escalation_tasks_by_shift.get("lpn-shift-456")
-        _p(f"escalation task present? {task is not None}")
-        if task is not None:
-            _p(f"task state: done={task.done()} cancelled={task.cancelled()}")
-            assert task.cancelled() or task.done()
+    _p("advance time +5m, then claim shift")
+    clock.tick(delta=timedelta(minutes=5))
+    await asyncio.sleep(0)
+
+    await client.post(
+        "/messages/inbound",
+        content=_WEI_YES,
+        headers=_JSON_HEADERS,
+    )
+    _dump_db(app, shift_id="lpn-shift-456")
+    await asyncio.wait({task}, timeout=1)
+    _p(f"task state: done={task.done()} cancelled={task.cancelled()}")
+    # escalate_if_unfilled swallows the CancelledError, so it ends as done
+    assert task.done()
+    assert "lpn-shift-456" not in app.state.escalation_tasks_by_shift
+
+    _p("advance time another +5m (reach +10m). should still be 0 phone calls.")
+    clock.tick(delta=timedelta(minutes=5))
+    await asyncio.sleep(0)
+
+    _p(f"call await_count: {call_mock.await_count}")
+    assert call_mock.await_count == 0
+
+
+def test_default_clock_follows_freezegun() -> None:
+    # the fixtures swap in a FakeClock, so check a fresh app's default now_fn;
+    # built before freezing, like the session-scoped app
+    fresh_app = create_app()
+    with freeze_time("2025-07-02 00:00:00"):
+        assert fresh_app.state.now_fn() == CLOCK_START